@@ -1,6 +1,6 @@
 """Lark Grammar Validator package."""
 
-from .validator import LarkGrammarValidator, main
+from .validator import LarkGrammarValidator, main, pretty_bounded
 
-__all__ = ["LarkGrammarValidator", "main"]
+__all__ = ["LarkGrammarValidator", "main", "pretty_bounded"]
 __version__ = "1.0.0"
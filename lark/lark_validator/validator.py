@@ -5,42 +5,209 @@ Validates Lark grammar files by attempting to parse them with the Lark parser.
 """
 
 import argparse
+import os
 import sys
+from functools import lru_cache
+from hashlib import blake2b
+from io import StringIO
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Optional, TextIO, Tuple
 
-from lark import Lark
-from lark.exceptions import LarkError
+from lark import Lark, Tree
+from lark.exceptions import GrammarError, LarkError, UnexpectedInput
+
+try:
+    # Optional Cython implementation of Lark's LALR parser and lexer
+    import lark_cython
+except ImportError:
+    lark_cython = None
+
+
+PARSER_CHOICES = ('lalr', 'earley')
+
+INDENT = '  '
+
+
+def _cache_dir() -> Optional[Path]:
+    """
+    Return the directory for cached parsers, or None if it cannot be determined.
+    
+    Uses $XDG_CACHE_HOME/lark_validator, falling back to ~/.cache/lark_validator.
+    Empty or relative XDG_CACHE_HOME values are ignored, as the XDG spec requires.
+    """
+    xdg_cache_home = os.environ.get('XDG_CACHE_HOME', '')
+    if os.path.isabs(xdg_cache_home):
+        return Path(xdg_cache_home) / 'lark_validator'
+    
+    try:
+        return Path.home() / '.cache' / 'lark_validator'
+    except (RuntimeError, KeyError, OSError):
+        return None
+
+
+def _cache_stem(grammar_content: str) -> Optional[Path]:
+    """
+    Return the on-disk cache path prefix for a grammar, or None if unavailable.
+    
+    Cache entries are named by a hash of the grammar text: <digest>.pkl holds a
+    compiled LALR parser and an empty <digest>.earley marks a grammar that is
+    not LALR(1). Lark stores its own hash of the grammar, options and Lark
+    version in the .pkl file and rebuilds on mismatch.
+    """
+    cache_dir = _cache_dir()
+    if cache_dir is None:
+        return None
+    
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return None
+    
+    return cache_dir / blake2b(grammar_content.encode('utf-8')).hexdigest()
+
+
+def _build_parser(grammar_content: str, parser_algo: str, use_cache: bool = True) -> Lark:
+    """
+    Build a Lark parser for a grammar using the given algorithm.
+    
+    Falls back to Earley when the grammar is not LALR(1), e.g. on
+    reduce/reduce collisions. LALR parsers use the lark_cython plugins
+    when the package is installed, and are cached on disk so repeat runs
+    skip grammar compilation. Grammars that failed LALR construction are
+    remembered on disk too, so repeat runs go straight to Earley.
+    
+    Args:
+        grammar_content: Source text of the Lark grammar
+        parser_algo: Parsing algorithm, 'lalr' or 'earley'
+        use_cache: Whether to use the on-disk cache
+        
+    Returns:
+        Lark parser instance
+    """
+    if parser_algo == 'lalr':
+        cache_stem = _cache_stem(grammar_content) if use_cache else None
+        earley_marker = Path(f"{cache_stem}.earley") if cache_stem is not None else None
+        
+        if earley_marker is None or not earley_marker.exists():
+            options = {}
+            if lark_cython is not None:
+                options['_plugins'] = lark_cython.plugins
+            if cache_stem is not None:
+                suffix = '-cython' if lark_cython is not None else ''
+                options['cache'] = f"{cache_stem}{suffix}.pkl"
+            try:
+                return Lark(grammar_content, parser='lalr', **options)
+            except GrammarError:
+                if earley_marker is not None:
+                    try:
+                        earley_marker.touch()
+                    except OSError:
+                        pass
+    
+    # Resolve ambiguities instead of building the full parse forest
+    return Lark(grammar_content, parser='earley', ambiguity='resolve')
+
+
+@lru_cache(maxsize=32)
+def _compile_grammar(grammar_content: str, parser_algo: str, use_cache: bool) -> Lark:
+    """
+    Compile a grammar, shared by all validators in the process.
+    
+    Keyed by the grammar text itself, so edited grammars are recompiled and
+    identical grammars are compiled only once.
+    """
+    return _build_parser(grammar_content, parser_algo, use_cache)
 
 
 class LarkGrammarValidator:
     """Validator for Lark grammar files."""
     
-    def __init__(self, grammar_path: str):
+    def __init__(self, grammar_path: str, parser_algo: str = 'lalr', use_cache: bool = True):
         """
         Initialize the validator with a grammar file path.
         
         Args:
             grammar_path: Path to the Lark grammar file
+            parser_algo: Parsing algorithm, 'lalr' (default) or 'earley'.
+                LALR grammars that fail to compile, or inputs that fail to
+                parse under LALR, fall back to Earley.
+            use_cache: Whether to cache compiled LALR parsers on disk
         """
+        if parser_algo not in PARSER_CHOICES:
+            raise ValueError(f"Unknown parser algorithm: {parser_algo}")
         self.grammar_path = Path(grammar_path)
+        self.parser_algo = parser_algo
+        self.use_cache = use_cache
+        self.parser_used = None
+        self.fallback_reason = None
+        self._grammar_content = None
+        self._grammar_mtime = None
+    
+    def describe_parser(self) -> Optional[str]:
+        """
+        Describe the parser used by the last validation.
         
-    def validate_grammar(self) -> Tuple[bool, Optional[str]]:
+        Returns:
+            Parser name, with the fallback reason if it differs from
+            parser_algo, or None if no parser was built yet
+        """
+        if self.parser_used is None or self.fallback_reason is None:
+            return self.parser_used
+        
+        return f"{self.parser_used} (fallback: {self.fallback_reason})"
+    
+    def _load_grammar_content(self) -> str:
+        """
+        Read the grammar file, re-reading it only if it was modified.
+        
+        Returns:
+            Grammar source text
+        """
+        mtime = self.grammar_path.stat().st_mtime
+        if self._grammar_content is None or mtime != self._grammar_mtime:
+            with open(self.grammar_path, 'r', encoding='utf-8') as f:
+                self._grammar_content = f.read()
+            self._grammar_mtime = mtime
+        
+        return self._grammar_content
+    
+    def _get_parser(self, grammar_content: Optional[str] = None) -> Lark:
+        """
+        Return the compiled parser for the grammar.
+        
+        Args:
+            grammar_content: Pre-read grammar text; loaded from disk if omitted
+            
+        Returns:
+            Lark parser instance
+        """
+        if grammar_content is None:
+            grammar_content = self._load_grammar_content()
+        
+        parser = _compile_grammar(grammar_content, self.parser_algo, self.use_cache)
+        self.parser_used = parser.options.parser
+        self.fallback_reason = None
+        if self.parser_used != self.parser_algo:
+            self.fallback_reason = "grammar is not LALR(1)"
+        
+        return parser
+        
+    def validate_grammar(self, grammar_content: Optional[str] = None) -> Tuple[bool, Optional[str]]:
         """
         Validate the Lark grammar by attempting to instantiate a parser.
         
+        Args:
+            grammar_content: Pre-read grammar text; loaded from disk if omitted
+            
         Returns:
             Tuple of (is_valid, error_message)
         """
-        if not self.grammar_path.exists():
+        if grammar_content is None and not self.grammar_path.exists():
             return False, f"Grammar file not found: {self.grammar_path}"
         
         try:
-            with open(self.grammar_path, 'r', encoding='utf-8') as f:
-                grammar_content = f.read()
-            
             # Attempt to create a parser with the grammar
-            parser = Lark(grammar_content, parser='earley')
+            self._get_parser(grammar_content)
             
             return True, None
             
@@ -59,16 +226,32 @@ class LarkGrammarValidator:
         Returns:
             Tuple of (is_valid, error_message, parse_tree)
         """
-        is_valid, error = self.validate_grammar()
+        if not self.grammar_path.exists():
+            return False, f"Grammar file not found: {self.grammar_path}", None
+        
+        try:
+            grammar_content = self._load_grammar_content()
+        except Exception as e:
+            return False, f"Unexpected error: {e}", None
+        
+        is_valid, error = self.validate_grammar(grammar_content)
         if not is_valid:
             return False, error, None
         
         try:
-            with open(self.grammar_path, 'r', encoding='utf-8') as f:
-                grammar_content = f.read()
-            
-            parser = Lark(grammar_content, parser='earley')
-            parse_tree = parser.parse(test_input)
+            parser = self._get_parser(grammar_content)
+            try:
+                parse_tree = parser.parse(test_input)
+            except UnexpectedInput:
+                if self.parser_used != 'lalr':
+                    raise
+                
+                # The grammars target llguidance, which is not limited to one
+                # token of lookahead, so retry before reporting the input invalid
+                parser = _compile_grammar(grammar_content, 'earley', self.use_cache)
+                self.parser_used = 'earley'
+                self.fallback_reason = "LALR(1) parse failed"
+                parse_tree = parser.parse(test_input)
             
             return True, None, parse_tree
             
@@ -78,6 +261,131 @@ class LarkGrammarValidator:
             return False, f"Unexpected error: {e}", None
 
 
+def pretty_bounded(tree: Tree, max_depth: Optional[int] = 32, max_children: Optional[int] = 50,
+                   out: Optional[TextIO] = None) -> None:
+    """
+    Write a parse tree in the format of Lark's Tree.pretty(), with limits.
+    
+    Lines are streamed to the output as they are produced instead of being
+    joined into one string, and subtrees below max_depth or children beyond
+    max_children are elided, so huge trees print in bounded memory.
+    
+    Args:
+        tree: Parse tree to print
+        max_depth: Deepest tree level to expand; None or 0 for no limit
+        max_children: Children shown per node; None or 0 for no limit
+        out: Stream to write to (default: sys.stdout)
+    """
+    if (max_depth is not None and max_depth < 0) or (max_children is not None and max_children < 0):
+        raise ValueError("max_depth and max_children must be non-negative or None")
+    
+    # 0 means no limit, matching the --max-depth/--max-children options
+    max_depth = max_depth or None
+    max_children = max_children or None
+    
+    write = (out or sys.stdout).write
+    stack = [(tree, 0)]
+    
+    while stack:
+        node, level = stack.pop()
+        indent = INDENT * level
+        
+        if not isinstance(node, Tree):
+            # Leaf token, or a marker for elided nodes
+            write(f"{indent}{node}\n")
+            continue
+        
+        children = node.children
+        if len(children) == 1 and not isinstance(children[0], Tree):
+            write(f"{indent}{node.data}\t{children[0]}\n")
+            continue
+        
+        write(f"{indent}{node.data}\n")
+        if not children:
+            continue
+        
+        if max_depth is not None and level >= max_depth:
+            write(f"{indent}{INDENT}...\n")
+            continue
+        
+        shown = children
+        if max_children is not None and len(children) > max_children:
+            shown = children[:max_children]
+            stack.append((f"... ({len(children) - max_children} more)", level + 1))
+        
+        stack.extend((child, level + 1) for child in reversed(shown))
+
+
+def _validate_file(grammar_file: str, parser_algo: str, use_cache: bool,
+                   test_input: Optional[str]
+                   ) -> Tuple[Optional[str], Optional[str], Optional[Tree], Optional[str]]:
+    """
+    Validate one grammar file and optionally parse test input with it.
+    
+    Args:
+        grammar_file: Path to the Lark grammar file
+        parser_algo: Parsing algorithm, 'lalr' or 'earley'
+        use_cache: Whether to cache compiled LALR parsers on disk
+        test_input: Sample input string to parse, or None to skip
+        
+    Returns:
+        Tuple of (grammar_error, parse_error, parse_tree, parser_description)
+    """
+    validator = LarkGrammarValidator(grammar_file, parser_algo=parser_algo, use_cache=use_cache)
+    
+    is_valid, error = validator.validate_grammar()
+    if not is_valid:
+        return error, None, None, validator.describe_parser()
+    
+    if test_input is None:
+        return None, None, None, validator.describe_parser()
+    
+    is_valid, error, parse_tree = validator.validate_with_test_input(test_input)
+    return None, error, parse_tree, validator.describe_parser()
+
+
+def _validate_file_in_worker(grammar_file: str, parser_algo: str, use_cache: bool,
+                             test_input: Optional[str], render_tree: bool,
+                             max_depth: Optional[int], max_children: Optional[int]
+                             ) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
+    """
+    Run _validate_file in a worker process for batch validation.
+    
+    Only strings are returned: parse trees can be too deep to pickle, so the
+    tree is rendered here with pretty_bounded when requested.
+    
+    Returns:
+        Tuple of (grammar_error, parse_error, parse_tree_text, parser_description)
+    """
+    grammar_error, parse_error, parse_tree, parser_description = _validate_file(
+        grammar_file, parser_algo, use_cache, test_input
+    )
+    
+    tree_text = None
+    if render_tree and parse_tree is not None:
+        buffer = StringIO()
+        pretty_bounded(parse_tree, max_depth=max_depth, max_children=max_children, out=buffer)
+        tree_text = buffer.getvalue()
+    
+    return grammar_error, parse_error, tree_text, parser_description
+
+
+def _positive_int(value: str) -> int:
+    """Argparse type for options that must be a positive integer."""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def _tree_limit(value: str) -> int:
+    """Argparse type for parse tree limits, where 0 means no limit as in pretty_bounded."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 (no limit) or a positive integer, got {value}")
+    return number
+
+
 def main():
     """Main entry point for the validator."""
     parser = argparse.ArgumentParser(
@@ -89,32 +397,36 @@ Examples:
   lark-validator spec.lark --test-input "import ballerina/io;"
   lark-validator spec.lark --test-file sample_input.txt
   lark-validator spec.lark --verbose
+  lark-validator spec.lark --parser earley
+  lark-validator spec.lark spec_clean.lark spec_minimal.lark --jobs 4
         """
     )
     
-    parser.add_argument('grammar_file', help='Path to the Lark grammar file')
+    parser.add_argument('grammar_files', nargs='+', metavar='grammar_file',
+                        help='Path to the Lark grammar file(s)')
     parser.add_argument('--test-input', '-i', help='Test input string to parse')
     parser.add_argument('--test-file', '-f', help='File containing test input')
+    parser.add_argument('--parser', '-p', choices=PARSER_CHOICES, default='lalr',
+                        help='Parsing algorithm (default: lalr, falls back to earley '
+                             'for non-LALR grammars and inputs)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not load or save compiled parsers in the on-disk cache')
+    parser.add_argument('--jobs', '-j', type=_positive_int,
+                        help='Worker processes for multiple grammar files (default: CPU count)')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+    parser.add_argument('--max-depth', type=_tree_limit, default=32,
+                        help='Deepest parse tree level printed in verbose mode, '
+                             '0 for no limit (default: 32)')
+    parser.add_argument('--max-children', type=_tree_limit, default=50,
+                        help='Children printed per parse tree node in verbose mode, '
+                             '0 for no limit (default: 50)')
     
     args = parser.parse_args()
     
-    validator = LarkGrammarValidator(args.grammar_file)
-    
-    print(f"Validating grammar: {args.grammar_file}")
-    print("-" * 60)
-    
-    is_valid, error = validator.validate_grammar()
-    
-    if is_valid:
-        print("✓ Grammar is valid!")
-    else:
-        print(f"✗ Grammar validation failed:")
-        print(f"  {error}")
-        sys.exit(1)
-    
-    # Test with input if provided
+    # Test with input if provided. A test file that cannot be read is
+    # reported after the grammar results, as for a single grammar before.
     test_input = None
+    test_file_error = None
     if args.test_input:
         test_input = args.test_input
     elif args.test_file:
@@ -122,27 +434,89 @@ Examples:
             with open(args.test_file, 'r', encoding='utf-8') as f:
                 test_input = f.read()
         except Exception as e:
-            print(f"\n✗ Error reading test file: {e}")
-            sys.exit(1)
+            test_file_error = e
+    
+    test_input = test_input or None
+    use_cache = not args.no_cache
+    batch = len(args.grammar_files) > 1
+    
+    if not batch:
+        # Keep the parse tree in-process so it can be streamed to stdout
+        results = [_validate_file(args.grammar_files[0], args.parser, use_cache, test_input)]
+    else:
+        # Grammar compilation is CPU-bound, so validate files in parallel.
+        # Imported here to keep single-file startup fast.
+        from concurrent.futures import ProcessPoolExecutor
+        
+        options = (args.parser, use_cache, test_input, args.verbose, args.max_depth, args.max_children)
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            futures = [executor.submit(_validate_file_in_worker, grammar_file, *options)
+                       for grammar_file in args.grammar_files]
+            
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # Includes BrokenProcessPool if a worker died
+                    results.append((f"Worker failed: {type(e).__name__}: {e}", None, None, None))
     
-    if test_input:
-        print(f"\nTesting with input:")
+    failed = False
+    if batch and test_input and args.verbose:
+        # Shared by every grammar, so print it once
+        print("Test input:")
         print("-" * 60)
-        if args.verbose:
-            print(test_input)
-            print("-" * 60)
+        print(test_input)
+        print("-" * 60)
+        print()
+    
+    for index, (grammar_file, result) in enumerate(zip(args.grammar_files, results)):
+        grammar_error, parse_error, parse_tree, parser_description = result
         
-        is_valid, error, parse_tree = validator.validate_with_test_input(test_input)
+        if index > 0:
+            print()
+        print(f"Validating grammar: {grammar_file}")
+        print("-" * 60)
         
-        if is_valid:
-            print("✓ Input parsed successfully!")
-            if args.verbose and parse_tree:
-                print("\nParse tree:")
-                print(parse_tree.pretty())
+        if grammar_error is None:
+            print("✓ Grammar is valid!")
         else:
-            print(f"✗ Parsing failed:")
-            print(f"  {error}")
-            sys.exit(1)
+            print(f"✗ Grammar validation failed:")
+            print(f"  {grammar_error}")
+            failed = True
+            continue
+        
+        if test_input:
+            print(f"\nTesting with input:")
+            print("-" * 60)
+            if args.verbose and not batch:
+                print(test_input)
+                print("-" * 60)
+            
+            if parse_error is None:
+                print("✓ Input parsed successfully!")
+                if args.verbose and parse_tree is not None:
+                    print("\nParse tree:")
+                    if isinstance(parse_tree, str):
+                        # Already rendered by a batch worker
+                        print(parse_tree, end='')
+                    else:
+                        pretty_bounded(parse_tree, max_depth=args.max_depth,
+                                       max_children=args.max_children, out=sys.stdout)
+            else:
+                print(f"✗ Parsing failed:")
+                print(f"  {parse_error}")
+                failed = True
+        
+        if parser_description:
+            print(f"\nParser: {parser_description}")
+    
+    if test_file_error is not None:
+        print(f"\n✗ Error reading test file: {test_file_error}")
+        sys.exit(1)
+    
+    if failed:
+        sys.exit(1)
     
     print("\n" + "=" * 60)
     print("Validation complete!")
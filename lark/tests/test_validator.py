@@ -0,0 +1,322 @@
+"""Tests for the Lark grammar validator."""
+
+import builtins
+import io
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+from lark_validator import LarkGrammarValidator, main, pretty_bounded
+from lark_validator import validator as validator_module
+
+LARK_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_INPUT = (LARK_DIR / 'sample_input.txt').read_text(encoding='utf-8')
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Keep parser caches out of the user's home and between tests."""
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    validator_module._compile_grammar.cache_clear()
+    yield
+    validator_module._compile_grammar.cache_clear()
+
+
+def grammar(name: str) -> str:
+    return str(LARK_DIR / name)
+
+
+def parse_sample(name: str):
+    is_valid, error, parse_tree = LarkGrammarValidator(grammar(name)).validate_with_test_input(SAMPLE_INPUT)
+    assert is_valid, error
+    return parse_tree
+
+
+def run_main(monkeypatch, *argv):
+    """Run the CLI and return its exit code."""
+    monkeypatch.setattr(sys, 'argv', ['lark-validator', *argv])
+    try:
+        main()
+    except SystemExit as e:
+        return e.code
+    return 0
+
+
+class TestParserSelection:
+    def test_lalr_grammar_uses_lalr(self):
+        validator = LarkGrammarValidator(grammar('spec_minimal.lark'))
+        assert validator.validate_grammar() == (True, None)
+        assert validator.describe_parser() == 'lalr'
+
+    def test_non_lalr_grammar_falls_back_to_earley(self):
+        validator = LarkGrammarValidator(grammar('spec.lark'))
+        assert validator.validate_grammar() == (True, None)
+        assert validator.parser_used == 'earley'
+        assert validator.fallback_reason == 'grammar is not LALR(1)'
+
+    def test_lalr_failure_is_remembered_across_runs(self, tmp_path, monkeypatch):
+        assert LarkGrammarValidator(grammar('spec.lark')).validate_grammar() == (True, None)
+        assert len(list((tmp_path / 'cache' / 'lark_validator').glob('*.earley'))) == 1
+
+        # A cold process must go straight to Earley without building LALR tables
+        validator_module._compile_grammar.cache_clear()
+        algorithms = []
+        real_lark = validator_module.Lark
+
+        def recording_lark(grammar_content, **options):
+            algorithms.append(options['parser'])
+            return real_lark(grammar_content, **options)
+
+        monkeypatch.setattr(validator_module, 'Lark', recording_lark)
+        validator = LarkGrammarValidator(grammar('spec.lark'))
+        assert validator.validate_grammar() == (True, None)
+        assert algorithms == ['earley']
+        assert validator.fallback_reason == 'grammar is not LALR(1)'
+
+    def test_no_cache_does_not_record_lalr_failure(self, tmp_path):
+        validator = LarkGrammarValidator(grammar('spec.lark'), use_cache=False)
+        assert validator.validate_grammar() == (True, None)
+        assert not (tmp_path / 'cache').exists()
+
+    def test_lalr_parse_failure_retries_with_earley(self):
+        validator = LarkGrammarValidator(grammar('spec_clean.lark'))
+        is_valid, error, parse_tree = validator.validate_with_test_input(SAMPLE_INPUT)
+        assert is_valid, error
+        assert parse_tree is not None
+        assert validator.parser_used == 'earley'
+        assert validator.fallback_reason == 'LALR(1) parse failed'
+
+    def test_invalid_input_is_reported(self):
+        validator = LarkGrammarValidator(grammar('spec_minimal.lark'))
+        is_valid, error, parse_tree = validator.validate_with_test_input('garbage')
+        assert not is_valid
+        assert error.startswith('Parse error:')
+        assert parse_tree is None
+
+    def test_missing_grammar_is_reported(self):
+        validator = LarkGrammarValidator(grammar('missing.lark'))
+        is_valid, error = validator.validate_grammar()
+        assert not is_valid
+        assert 'Grammar file not found' in error
+
+    def test_unknown_parser_algo_is_rejected(self):
+        with pytest.raises(ValueError):
+            LarkGrammarValidator(grammar('spec.lark'), parser_algo='cyk')
+
+
+class TestGrammarReuse:
+    def test_validators_share_compiled_parser(self):
+        first = LarkGrammarValidator(grammar('spec_minimal.lark'))
+        second = LarkGrammarValidator(grammar('spec_minimal.lark'))
+
+        assert first.validate_with_test_input(SAMPLE_INPUT)[0]
+        assert second.validate_with_test_input(SAMPLE_INPUT)[0]
+
+        assert first._get_parser() is second._get_parser()
+        cache_info = validator_module._compile_grammar.cache_info()
+        assert cache_info.misses == 1
+        assert cache_info.hits >= 3
+
+    @pytest.fixture
+    def grammar_reads(self, tmp_path, monkeypatch):
+        """Copy spec_minimal.lark to tmp_path and count how often it is opened."""
+        grammar_file = tmp_path / 'grammar.lark'
+        grammar_file.write_text((LARK_DIR / 'spec_minimal.lark').read_text(encoding='utf-8'),
+                                encoding='utf-8')
+        reads = []
+
+        def counting_open(file, *args, **kwargs):
+            if Path(file) == grammar_file:
+                reads.append(file)
+            return builtins.open(file, *args, **kwargs)
+
+        monkeypatch.setattr(validator_module, 'open', counting_open, raising=False)
+        return grammar_file, reads
+
+    def test_grammar_is_read_once_per_validation(self, grammar_reads):
+        grammar_file, reads = grammar_reads
+        validator = LarkGrammarValidator(str(grammar_file))
+
+        assert validator.validate_with_test_input(SAMPLE_INPUT)[0]
+        assert len(reads) == 1
+
+        assert validator.validate_grammar() == (True, None)
+        assert validator.validate_with_test_input(SAMPLE_INPUT)[0]
+        assert len(reads) == 1
+
+    def test_grammar_is_reread_when_modified(self, grammar_reads):
+        grammar_file, reads = grammar_reads
+        validator = LarkGrammarValidator(str(grammar_file))
+        assert validator.validate_grammar() == (True, None)
+
+        grammar_file.write_text('start: "x"\n', encoding='utf-8')
+        mtime = grammar_file.stat().st_mtime + 10
+        os.utime(grammar_file, (mtime, mtime))
+
+        is_valid, error, _ = validator.validate_with_test_input('x')
+        assert is_valid, error
+        assert len(reads) == 2
+
+
+class TestCacheDir:
+    @pytest.mark.parametrize('value', ['', 'relative/cache'])
+    def test_empty_or_relative_xdg_cache_home_is_ignored(self, monkeypatch, value):
+        monkeypatch.setenv('XDG_CACHE_HOME', value)
+        assert validator_module._cache_dir() == Path.home() / '.cache' / 'lark_validator'
+
+    def test_missing_home_disables_cache(self, monkeypatch):
+        def no_home():
+            raise RuntimeError('Could not determine home directory.')
+
+        monkeypatch.delenv('XDG_CACHE_HOME')
+        monkeypatch.setattr(Path, 'home', staticmethod(no_home))
+        assert validator_module._cache_dir() is None
+        assert validator_module._cache_stem('start: "x"') is None
+
+
+class TestDiskCache:
+    @pytest.fixture
+    def cache_dir(self, tmp_path):
+        return tmp_path / 'cache' / 'lark_validator'
+
+    def test_lalr_parser_is_written_to_cache(self, cache_dir):
+        assert LarkGrammarValidator(grammar('spec_minimal.lark')).validate_grammar() == (True, None)
+
+        content = (LARK_DIR / 'spec_minimal.lark').read_text(encoding='utf-8')
+        suffix = '-cython' if validator_module.lark_cython is not None else ''
+        expected = f"{validator_module._cache_stem(content).name}{suffix}.pkl"
+        assert [path.name for path in cache_dir.glob('*.pkl')] == [expected]
+
+    def test_cold_process_loads_cached_parser(self, cache_dir, monkeypatch):
+        assert LarkGrammarValidator(grammar('spec_minimal.lark')).validate_grammar() == (True, None)
+        (cache_file,) = cache_dir.glob('*.pkl')
+        written = cache_file.stat().st_mtime_ns
+
+        validator_module._compile_grammar.cache_clear()
+        loads = []
+        real_load = validator_module.Lark._load
+
+        def recording_load(self, *args, **kwargs):
+            loads.append(args)
+            return real_load(self, *args, **kwargs)
+
+        monkeypatch.setattr(validator_module.Lark, '_load', recording_load)
+        validator = LarkGrammarValidator(grammar('spec_minimal.lark'))
+        is_valid, error, _ = validator.validate_with_test_input(SAMPLE_INPUT)
+
+        assert is_valid, error
+        assert len(loads) == 1
+        assert cache_file.stat().st_mtime_ns == written
+
+    def test_no_cache_writes_nothing(self, tmp_path, monkeypatch, capsys):
+        validator = LarkGrammarValidator(grammar('spec_minimal.lark'), use_cache=False)
+        assert validator.validate_grammar() == (True, None)
+
+        validator_module._compile_grammar.cache_clear()
+        assert run_main(monkeypatch, grammar('spec_minimal.lark'), '--no-cache') == 0
+        assert not (tmp_path / 'cache').exists()
+
+    def test_cython_parsers_use_separate_cache_file(self, cache_dir, monkeypatch):
+        class FakeLarkCython:
+            plugins = {}
+
+        monkeypatch.setattr(validator_module, 'lark_cython', FakeLarkCython)
+        assert LarkGrammarValidator(grammar('spec_minimal.lark')).validate_grammar() == (True, None)
+
+        (cache_file,) = cache_dir.glob('*.pkl')
+        assert cache_file.name.endswith('-cython.pkl')
+
+
+class TestPrettyBounded:
+    @pytest.mark.parametrize('name', ['spec.lark', 'spec_minimal.lark'])
+    def test_unbounded_output_matches_tree_pretty(self, name):
+        parse_tree = parse_sample(name)
+        out = io.StringIO()
+        pretty_bounded(parse_tree, max_depth=None, max_children=None, out=out)
+        assert out.getvalue() == parse_tree.pretty()
+
+    def test_zero_limits_mean_no_limit(self):
+        parse_tree = parse_sample('spec.lark')
+        out = io.StringIO()
+        pretty_bounded(parse_tree, max_depth=0, max_children=0, out=out)
+        assert out.getvalue() == parse_tree.pretty()
+
+    def test_max_depth_elides_deeper_subtrees(self):
+        parse_tree = parse_sample('spec.lark')
+        out = io.StringIO()
+        pretty_bounded(parse_tree, max_depth=2, max_children=None, out=out)
+        lines = out.getvalue().splitlines()
+
+        assert '      ...' in lines
+        # Nothing is printed below the elision marker's level
+        assert max(len(line) - len(line.lstrip(' ')) for line in lines) <= 6
+        assert len(lines) < len(parse_tree.pretty().splitlines())
+
+    def test_max_children_elides_extra_children(self):
+        parse_tree = parse_sample('spec_minimal.lark')
+        out = io.StringIO()
+        pretty_bounded(parse_tree, max_depth=None, max_children=1, out=out)
+        text = out.getvalue()
+
+        hidden = len(parse_tree.children) - 1
+        assert text.startswith(f"{parse_tree.data}\n")
+        assert f"  ... ({hidden} more)\n" in text
+
+    def test_negative_limits_are_rejected(self):
+        with pytest.raises(ValueError):
+            pretty_bounded(parse_sample('spec_minimal.lark'), max_depth=-1, out=io.StringIO())
+
+
+class TestMain:
+    def test_batch_results_are_reported_in_order(self, monkeypatch, capsys):
+        files = [grammar('spec_minimal.lark'), grammar('missing.lark'), grammar('spec.lark')]
+        exit_code = run_main(monkeypatch, *files, '--test-file', str(LARK_DIR / 'sample_input.txt'))
+        output = capsys.readouterr().out
+
+        assert exit_code == 1
+        positions = [output.index(f"Validating grammar: {path}") for path in files]
+        assert positions == sorted(positions)
+        assert 'Grammar file not found' in output
+        assert 'Validation complete!' not in output
+
+    def test_batch_success_exits_cleanly(self, monkeypatch, capsys):
+        exit_code = run_main(monkeypatch, grammar('spec.lark'), grammar('spec_minimal.lark'),
+                             '--test-input', SAMPLE_INPUT, '--verbose', '--jobs', '2')
+        output = capsys.readouterr().out
+
+        assert exit_code == 0
+        assert output.count('✓ Input parsed successfully!') == 2
+        assert output.count('Parse tree:') == 2
+        assert 'Validation complete!' in output
+        assert output.count(SAMPLE_INPUT) == 1
+
+    def test_single_file_tree_is_streamed_to_stdout(self, monkeypatch, capsys):
+        streams = []
+        real_pretty_bounded = validator_module.pretty_bounded
+
+        def recording_pretty_bounded(tree, **options):
+            streams.append(options['out'])
+            real_pretty_bounded(tree, **options)
+
+        monkeypatch.setattr(validator_module, 'pretty_bounded', recording_pretty_bounded)
+        exit_code = run_main(monkeypatch, grammar('spec_minimal.lark'), '--test-input', SAMPLE_INPUT,
+                             '--verbose', '--max-depth', '0', '--max-children', '0')
+        output = capsys.readouterr().out
+
+        assert exit_code == 0
+        assert len(streams) == 1 and not isinstance(streams[0], io.StringIO)
+        assert parse_sample('spec_minimal.lark').pretty() in output
+
+    def test_unreadable_test_file_is_reported_after_grammar(self, monkeypatch, capsys):
+        exit_code = run_main(monkeypatch, grammar('spec_minimal.lark'), '--test-file', 'missing.txt')
+        output = capsys.readouterr().out
+
+        assert exit_code == 1
+        assert output.index('✓ Grammar is valid!') < output.index('\n✗ Error reading test file:')
+        assert 'Validation complete!' not in output
+
+    @pytest.mark.parametrize('option', [['--jobs', '0'], ['--max-depth', '-1']])
+    def test_invalid_limits_are_usage_errors(self, monkeypatch, option):
+        assert run_main(monkeypatch, grammar('spec.lark'), *option) == 2